@@ -1,11 +1,30 @@
-import requests
-from bs4 import BeautifulSoup
-from flask import Flask, jsonify, render_template_string
+import asyncio
+import aiohttp
+from selectolax.lexbor import LexborHTMLParser
+from flask import Flask, Response, render_template_string, request
+from flask_compress import Compress
 from flask_cors import CORS
+import functools
+import hashlib
+import logging
+import multiprocessing
+import orjson
 import re
 import os
+import random
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 
+logging.basicConfig(
+   level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+   format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+)
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 
 # Add CORS configuration
@@ -16,34 +35,152 @@ CORS(app, origins=[
    "http://127.0.0.1:3000"
 ])
 
+# Compress JSON responses that are not already pre-gzipped
+app.config['COMPRESS_MIMETYPES'] = ['application/json']
+app.config['COMPRESS_LEVEL'] = 6
+Compress(app)
+
 # Global variables to store scraped data and timestamp
 cached_props_data = []
-cache_timestamp = None
-CACHE_DURATION_MINUTES = 30  # Cache expires after 30 minutes
+cached_props_by_sport = {}  # Same props bucketed by sport display name
+cache_timestamp = None  # When the least recently verified page was last scraped successfully
+CACHE_DURATION_MINUTES = 30  # A page's props are dropped if it hasn't been scraped successfully for this long
+REFRESH_INTERVAL_MINUTES = 25  # Each sport/date page is re-scraped before the cache expires
+REFRESH_JITTER_MINUTES = 5  # Pages expire up to this much early so refreshes spread out over time
+REFRESH_CHECK_SECONDS = 60  # How often the refresher checks for stale pages
+INITIAL_LOAD_TIMEOUT_SECONDS = 60  # How long a cold-start request waits for the first scrape
 
-def is_cache_expired():
-   """Check if cache has expired"""
-   global cache_timestamp
-   if cache_timestamp is None:
-       return True
+# (sport key, date range) -> (expires_at, verified_at, props) for every scraped page;
+# verified_at is the last time the page was fetched successfully
+_page_cache = {}
+next_refresh_at = None  # When the next page in _page_cache goes stale
+
+# Background refresher state
+_refresh_lock = threading.Lock()
+_refresher_lock = threading.Lock()
+_refresher_thread = None
+_cache_ready = threading.Event()
+
+# Serialized endpoint payloads, rebuilt whenever the cache refreshes
+_precomputed = {}
+
+GZIP_LEVEL = 6  # Compression level for the pre-gzipped payloads
+
+# Sports that have their own /<sport>-props endpoint
+SPORT_ENDPOINTS = ['MLB', 'WNBA', 'NBA', 'NFL', 'NHL', 'UFC']
+
+# One scraped prop; converted_betslip_line is None when the line needed no conversion
+Prop = namedtuple('Prop', [
+   'event',
+   'event_date',
+   'market',
+   'betslip_line',
+   'converted_betslip_line',
+   'odds',
+   'draftkings_url',
+   'sport',
+   'scraped_date_range',
+   'scraped_timestamp'
+])
+
+# Matches bet lines of the form "number+" (e.g. "1+", "25+")
+_BET_LINE_RE = re.compile(r'^(\d+)\+$')
+
+def get_cached_or_fresh_data():
+   """Get the cached data; scraping only ever happens on the background refresher"""
+   start_background_refresh()
+   
+   # Only a cold start waits, and only for the refresher's first scrape
+   if not _cache_ready.wait(timeout=INITIAL_LOAD_TIMEOUT_SECONDS):
+       logger.warning("Initial scrape still running, serving empty cache")
+   
+   logger.debug("Using cached data (age: %s)...", datetime.now() - cache_timestamp if cache_timestamp else None)
+   return cached_props_data
+
+def update_cache(props, props_by_sport, sports_summary):
+   """Store freshly scraped props and rebuild the precomputed endpoint payloads"""
+   global cached_props_data, cached_props_by_sport, _precomputed
+   payloads = precompute_payloads(props, props_by_sport, sports_summary)
    
+   # Swap in the new references; readers never see a partially built cache.
+   # Each payload carries its own ETag, so a body and its tag always come from the same refresh.
+   _precomputed = payloads
+   cached_props_data = props
+   cached_props_by_sport = props_by_sport
+   _cache_ready.set()
+
+def get_stale_pages(force=False):
+   """List the (sport key, date range) pages that are missing from the page cache or past their expiry"""
    now = datetime.now()
-   cache_age = now - cache_timestamp
-   return cache_age > timedelta(minutes=CACHE_DURATION_MINUTES)
+   stale_pages = []
+   for sport_key, config in SPORT_CONFIGS.items():
+       for date_range in config['date_ranges']:
+           entry = _page_cache.get((sport_key, date_range))
+           if force or entry is None or entry[0] <= now:
+               stale_pages.append((sport_key, date_range))
+   return stale_pages
 
-def get_cached_or_fresh_data():
-   """Get cached data if available and not expired, otherwise scrape fresh data"""
-   global cached_props_data, cache_timestamp
+def refresh_cache(force=False):
+   """Re-scrape stale pages (every page when force=True) and swap the rebuilt props into the cache"""
+   with _refresh_lock:
+       stale_pages = get_stale_pages(force)
+       if not stale_pages and _cache_ready.is_set():
+           return cached_props_data
+       
+       logger.info("Refreshing %d of %d props pages...", len(stale_pages), sum(len(c['date_ranges']) for c in SPORT_CONFIGS.values()))
+       changed_pages = scrape_player_props(stale_pages) + drop_expired_pages()
+       update_next_refresh_at()
+       update_cache_timestamp()
+       
+       # Unchanged or failed pages leave the published payloads and ETags alone
+       if changed_pages == 0 and _cache_ready.is_set():
+           logger.info("No props pages changed")
+           return cached_props_data
+       
+       props, props_by_sport, sports_summary = aggregate_page_cache()
+       update_cache(props, props_by_sport, sports_summary)
+   return props
+
+def drop_expired_pages():
+   """Drop pages that have kept failing for CACHE_DURATION_MINUTES so old odds aren't served as current"""
+   cutoff = datetime.now() - timedelta(minutes=CACHE_DURATION_MINUTES)
+   expired = [page for page, (_, verified_at, _) in _page_cache.items() if verified_at < cutoff]
+   for sport_key, date_range in expired:
+       logger.warning("Dropping props for %s on %s: not scraped successfully for over %d minutes",
+                      SPORT_CONFIGS[sport_key]['name'], date_range, CACHE_DURATION_MINUTES)
+       del _page_cache[(sport_key, date_range)]
+   return len(expired)
+
+def update_cache_timestamp():
+   """Age the cache by its least recently verified page, so re-verified but unchanged data still counts as fresh"""
+   global cache_timestamp
+   cache_timestamp = min((verified_at for _, verified_at, _ in _page_cache.values()), default=None)
+
+def update_next_refresh_at():
+   """Record when the next page is due, ignoring failed pages whose expiry has already passed"""
+   global next_refresh_at
+   now = datetime.now()
+   next_refresh_at = min((expires_at for expires_at, _, _ in _page_cache.values() if expires_at > now), default=None)
+
+def _refresh_loop():
+   """Keep the cache fresh, re-scraping each page as it goes stale"""
+   while True:
+       try:
+           refresh_cache()
+       except Exception:
+           logger.exception("Background props cache refresh failed")
+       time.sleep(REFRESH_CHECK_SECONDS)
+
+def start_background_refresh():
+   """Start the background refresher thread once per process"""
+   global _refresher_thread
+   if _refresher_thread is not None:
+       return
    
-   if cached_props_data and not is_cache_expired():
-       print(f"Using cached data (age: {datetime.now() - cache_timestamp})...")
-       return cached_props_data
-   else:
-       print("Cache expired or empty, scraping fresh data...")
-       fresh_data = scrape_player_props()
-       cached_props_data = fresh_data
-       cache_timestamp = datetime.now()
-       return fresh_data
+   with _refresher_lock:
+       if _refresher_thread is None:
+           _refresher_thread = threading.Thread(target=_refresh_loop, name='props-refresher', daemon=True)
+           _refresher_thread.start()
 
 def convert_bet_line(bet_line):
    """Convert '1+' to 'Over 0.5', '2+' to 'Over 1.5', etc."""
@@ -51,175 +188,469 @@ def convert_bet_line(bet_line):
        return bet_line
    
    # Check if it matches the pattern "number+"
-   match = re.match(r'^(\d+)\+$', bet_line.strip())
+   match = _BET_LINE_RE.match(bet_line.strip())
    if match:
        number = int(match.group(1))
        return f"Over {number - 0.5}"
    
    return bet_line
 
-def scrape_player_props():
-   """Scrape player props from DraftKings - all active sports for today and tomorrow"""
-   base_url = "https://dknetwork.draftkings.com/draftkings-sportsbook-player-props/"
-   
-   # Sport IDs and configurations
-   sport_configs = {
-       'mlb': {'id': 84240, 'name': 'MLB', 'date_ranges': ['today', 'tomorrow']},
-       'wnba': {'id': 94682, 'name': 'WNBA', 'date_ranges': ['today', 'tomorrow']},
-       'nba': {'id': 42648, 'name': 'NBA', 'date_ranges': ['today', 'tomorrow']},
-       'nhl': {'id': 42133, 'name': 'NHL', 'date_ranges': ['today', 'tomorrow']},
-       'nfl': {'id': 88808, 'name': 'NFL', 'date_ranges': ['today', 'tomorrow']},
-       'ufc': {'id': 9034, 'name': 'UFC', 'date_ranges': ['today', 'tomorrow']},
-       'ncaaf': {'id': 87637, 'name': 'NCAA Football', 'date_ranges': ['today', 'tomorrow']},
-       'ncaa_basketball': {'id': 92483, 'name': 'NCAA Basketball', 'date_ranges': ['today', 'tomorrow']},
-       'ncaa_womens_basketball': {'id': 36647, 'name': 'NCAA Womens Basketball', 'date_ranges': ['today', 'tomorrow']},
-       'ncaa_baseball': {'id': 41151, 'name': 'NCAA Baseball', 'date_ranges': ['today', 'tomorrow']},
-       'ncaa_ice_hockey': {'id': 84813, 'name': 'NCAA Ice Hockey', 'date_ranges': ['today', 'tomorrow']},
-       'mls': {'id': 89345, 'name': 'MLS', 'date_ranges': ['today']},  # Soccer: today only
-       'premier_league': {'id': 40253, 'name': 'England Premier League', 'date_ranges': ['today']},
-       'champions_league': {'id': 40685, 'name': 'Champions League', 'date_ranges': ['today']},
-       'europa_league': {'id': 41410, 'name': 'Europa League', 'date_ranges': ['today']},
-   }
+BASE_URL = "https://dknetwork.draftkings.com/draftkings-sportsbook-player-props/"
+
+# Sport IDs and configurations
+SPORT_CONFIGS = {
+   'mlb': {'id': 84240, 'name': 'MLB', 'date_ranges': ['today', 'tomorrow']},
+   'wnba': {'id': 94682, 'name': 'WNBA', 'date_ranges': ['today', 'tomorrow']},
+   'nba': {'id': 42648, 'name': 'NBA', 'date_ranges': ['today', 'tomorrow']},
+   'nhl': {'id': 42133, 'name': 'NHL', 'date_ranges': ['today', 'tomorrow']},
+   'nfl': {'id': 88808, 'name': 'NFL', 'date_ranges': ['today', 'tomorrow']},
+   'ufc': {'id': 9034, 'name': 'UFC', 'date_ranges': ['today', 'tomorrow']},
+   'ncaaf': {'id': 87637, 'name': 'NCAA Football', 'date_ranges': ['today', 'tomorrow']},
+   'ncaa_basketball': {'id': 92483, 'name': 'NCAA Basketball', 'date_ranges': ['today', 'tomorrow']},
+   'ncaa_womens_basketball': {'id': 36647, 'name': 'NCAA Womens Basketball', 'date_ranges': ['today', 'tomorrow']},
+   'ncaa_baseball': {'id': 41151, 'name': 'NCAA Baseball', 'date_ranges': ['today', 'tomorrow']},
+   'ncaa_ice_hockey': {'id': 84813, 'name': 'NCAA Ice Hockey', 'date_ranges': ['today', 'tomorrow']},
+   'mls': {'id': 89345, 'name': 'MLS', 'date_ranges': ['today']},  # Soccer: today only
+   'premier_league': {'id': 40253, 'name': 'England Premier League', 'date_ranges': ['today']},
+   'champions_league': {'id': 40685, 'name': 'Champions League', 'date_ranges': ['today']},
+   'europa_league': {'id': 41410, 'name': 'Europa League', 'date_ranges': ['today']},
+}
+MAX_CONCURRENT_REQUESTS = 10
+REQUEST_TIMEOUT_SECONDS = 10
+READ_CHUNK_SIZE = 64 * 1024
+# Opening tag of the props table; a bare "tb_pp_table" would also match CSS or scripts in <head>
+_TABLE_START_RE = re.compile(rb'<table\b[^>]*\bclass\s*=\s*["\']?[^"\'>]*\btb_pp_table\b', re.IGNORECASE)
+_TABLE_END_MARKER = b'</table>'
+_MARKER_OVERLAP = 1024  # Bytes re-scanned before each new chunk so a tag split across chunks still matches
+MAX_DRAIN_BYTES = 256 * 1024  # Most of the page left after the props table that is still read (and discarded) to keep the connection alive
+REQUEST_HEADERS = {
+   'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0 Safari/537.36'
+}
+
+# URL -> (etag, last_modified, parsed props) from the last successful fetch of each page
+_url_etags = {}
+
+# Worker processes for parsing fetched pages, shared across scrapes; selectolax holds the GIL,
+# so threads could not parse in parallel. Spawned rather than forked because the app is threaded.
+_parse_executor = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn'))
+
+def scrape_player_props(pages):
+   """Scrape the given (sport key, date range) pages from DraftKings into the page cache
+
+   Returns how many pages came back with different props than were cached.
+   """
+   return asyncio.run(scrape_player_props_async(pages))
+
+async def fetch(session, url, headers=None, stop_after_table=True):
+   """Stream a page body, by default keeping only what arrives up to the end of the props table
    
-   all_props_data = []
+   Returns (body, etag, last_modified, complete); body is None when the server answers
+   304 Not Modified, and complete is False when part of the body was not kept.
+   """
+   async with session.get(url, headers=headers) as response:
+       response.raise_for_status()
+       etag = response.headers.get('ETag')
+       last_modified = response.headers.get('Last-Modified')
+       
+       if response.status == 304:
+           return None, etag, last_modified, True
+       
+       if not stop_after_table:
+           return await response.read(), etag, last_modified, True
+       
+       body = bytearray()
+       table_start = -1
+       table_end = -1
+       drained = 0
+       async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+           if table_end >= 0:
+               # Read a short remainder to the end so the connection goes back to the pool;
+               # abandoning a response mid-body closes it and the next page pays a new TLS handshake
+               drained += len(chunk)
+               if drained > MAX_DRAIN_BYTES:
+                   break
+               continue
+           
+           # Re-scan the tail of the previous chunks in case a tag straddles chunks
+           search_from = max(len(body) - _MARKER_OVERLAP, 0)
+           body += chunk
+           
+           if table_start < 0:
+               match = _TABLE_START_RE.search(body, search_from)
+               if not match:
+                   continue
+               table_start = search_from = match.start()
+           
+           # Everything after the props table is page chrome we never parse
+           table_end = body.find(_TABLE_END_MARKER, max(search_from, table_start))
+       
+       return body, etag, last_modified, drained == 0
+
+async def scrape_page(session, sport_id, sport_display_name, date_range, scrape_ts):
+   """Fetch one sport/date page and parse its props off the event loop"""
+   # Build URL with sport ID, date, and view=2 for "Most Bet Player Props"
+   url = f"{BASE_URL}?tb_eg={sport_id}&tb_edate={date_range}&tb_view=2"
    
-   print("Scraping player props for all sports...")
+   # Send the validators from the last fetch so unchanged pages come back as 304
+   request_headers = {}
+   previous_props = None
+   previous = _url_etags.get(url)
+   if previous:
+       previous_etag, previous_last_modified, previous_props = previous
+       if previous_etag:
+           request_headers['If-None-Match'] = previous_etag
+       if previous_last_modified:
+           request_headers['If-Modified-Since'] = previous_last_modified
    
-   # Scrape each sport for both today and tomorrow
-   for sport_name, config in sport_configs.items():
-       sport_id = config['id']
-       sport_display_name = config['name']
-       date_ranges = config['date_ranges']
+   logger.debug("Fetching URL: %s", url)
+   html, etag, last_modified, complete = await fetch(session, url, request_headers)
+   
+   if html is None and previous_props is not None:
+       logger.debug("Not modified, reusing parsed props for %s", url)
+       return previous_props
+   
+   if html is None:
+       # A 304 we never asked for (e.g. from a misbehaving proxy); there is nothing to reuse
+       logger.warning("Unexpected 304 for %s, refetching without validators", url)
+       html, etag, last_modified, complete = await fetch(session, url, {'Cache-Control': 'no-cache'})
+       if html is None:
+           raise RuntimeError(f"Got 304 Not Modified with no cached page for {url}")
+   
+   loop = asyncio.get_running_loop()
+   page_props = await loop.run_in_executor(_parse_executor, parse_props_page, html, sport_display_name, date_range, scrape_ts)
+   
+   # Reading stopped early but the table did not parse; fetch the whole page before giving up
+   if page_props is None and not complete:
+       logger.warning("Props table not found in truncated page for %s on %s, refetching full page", sport_display_name, date_range)
+       html, etag, last_modified, complete = await fetch(session, url, stop_after_table=False)
+       page_props = await loop.run_in_executor(_parse_executor, parse_props_page, html, sport_display_name, date_range, scrape_ts)
+   
+   if page_props is None:
+       page_props = []
+   
+   if etag or last_modified:
+       _url_etags[url] = (etag, last_modified, page_props)
+   return page_props
+
+async def scrape_player_props_async(pages):
+   """Fetch the given sport/date pages concurrently, store each one's props and count the pages that changed"""
+   # Every prop parsed in this scrape shares one timestamp
+   scrape_ts = datetime.now().isoformat()
+   
+   # A single session keeps connections to the DraftKings host alive across all pages
+   connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_REQUESTS)
+   # Per-socket limits, so pages queued behind the connection pool limit don't time out while waiting
+   timeout = aiohttp.ClientTimeout(total=None, sock_connect=REQUEST_TIMEOUT_SECONDS, sock_read=REQUEST_TIMEOUT_SECONDS)
+   async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=REQUEST_HEADERS) as session:
+       results = await asyncio.gather(
+           *(
+               scrape_page(session, SPORT_CONFIGS[sport_key]['id'], SPORT_CONFIGS[sport_key]['name'], date_range, scrape_ts)
+               for sport_key, date_range in pages
+           ),
+           return_exceptions=True
+       )
+   
+   changed_pages = 0
+   for (sport_key, date_range), page_props in zip(pages, results):
+       if isinstance(page_props, Exception):
+           # Keep any previous props for this page; it is still stale so the next check retries it
+           logger.error("Error scraping %s for %s: %s", SPORT_CONFIGS[sport_key]['name'], date_range, page_props)
+           continue
+       
+       previous = _page_cache.get((sport_key, date_range))
+       if previous is not None and same_props(previous[2], page_props):
+           # Keep the previous records (and their scraped_timestamp) so payloads and ETags stay identical
+           page_props = previous[2]
+       else:
+           changed_pages += 1
        
-       print(f"Scraping {sport_display_name} (ID: {sport_id})...")
-       sport_total_props = 0
+       # Jitter the expiry so pages drift apart instead of all refreshing together
+       now = datetime.now()
+       ttl_minutes = REFRESH_INTERVAL_MINUTES - random.uniform(0, REFRESH_JITTER_MINUTES)
+       _page_cache[(sport_key, date_range)] = (now + timedelta(minutes=ttl_minutes), now, page_props)
+   
+   return changed_pages
+
+def same_props(old_props, new_props):
+   """Check whether two scrapes of a page found the same props, ignoring when they were scraped"""
+   if old_props is new_props:
+       return True
+   # scraped_timestamp is the last Prop field
+   return [prop[:-1] for prop in old_props] == [prop[:-1] for prop in new_props]
+
+def aggregate_page_cache():
+   """Merge the cached pages in sport order into the deduplicated prop list, per-sport buckets and summary"""
+   all_props_data = []
+   props_by_sport = {}
+   sports_summary = {}
+   seen_keys = set()
+   duplicates_skipped = 0
+   
+   for sport_key, config in SPORT_CONFIGS.items():
+       sport_display_name = config['name']
        
-       # Loop through each date range for this sport (today, tomorrow)
-       for date_range in date_ranges:
-           print(f"  Scraping {sport_display_name} for {date_range}...")
+       for date_range in config['date_ranges']:
+           entry = _page_cache.get((sport_key, date_range))
+           if entry is None:
+               continue
            
-           try:
-               # Build URL with sport ID, date, and view=2 for "Most Bet Player Props"
-               url = f"{base_url}?tb_eg={sport_id}&tb_edate={date_range}&tb_view=2"
+           for prop_data in entry[2]:
+               # Check for duplicates
+               key = (
+                   prop_data.event,
+                   prop_data.event_date,
+                   prop_data.market,
+                   prop_data.betslip_line,
+                   prop_data.scraped_date_range
+               )
                
-               print(f"    Fetching URL: {url}")
-               response = requests.get(url)
-               response.raise_for_status()
-               soup = BeautifulSoup(response.content, 'html.parser')
-               
-               # Find the props table
-               props_table = soup.find('table', class_='tb_pp_table')
-               
-               if not props_table:
-                   print(f"    No props table found for {sport_display_name} on {date_range}")
+               if key in seen_keys:
+                   duplicates_skipped += 1
                    continue
                
-               # Find all table rows (excluding header)
-               rows = props_table.find('tbody')
-               if not rows:
-                   print(f"    No tbody found for {sport_display_name} on {date_range}")
-                   continue
+               seen_keys.add(key)
+               all_props_data.append(prop_data)
+               props_by_sport.setdefault(sport_display_name, []).append(prop_data)
                
-               prop_rows = rows.find_all('tr')
-               print(f"    Found {len(prop_rows)} prop rows for {sport_display_name} on {date_range}")
-               
-               for row in prop_rows:
-                   prop_data = parse_prop_row(row, sport_display_name, date_range)
-                   if prop_data:
-                       # Check for duplicates
-                       duplicate = any(
-                           existing['event'] == prop_data['event'] and
-                           existing['event_date'] == prop_data['event_date'] and
-                           existing['market'] == prop_data['market'] and
-                           existing['betslip_line'] == prop_data['betslip_line'] and
-                           existing['scraped_date_range'] == prop_data['scraped_date_range']
-                           for existing in all_props_data
-                       )
-                       
-                       if not duplicate:
-                           all_props_data.append(prop_data)
-                           sport_total_props += 1
-                       else:
-                           print(f"        Skipping duplicate: {prop_data['market']} - {prop_data['betslip_line']}")
-                   
-           except Exception as e:
-               print(f"    Error scraping {sport_display_name} for {date_range}: {e}")
-               continue
-       
-       print(f"  Total props found for {sport_display_name}: {sport_total_props}")
-       print()
+               # Build the per-sport summary as props come in
+               if sport_display_name not in sports_summary:
+                   sports_summary[sport_display_name] = {
+                       'count': 0,
+                       'sample_markets': set(),
+                       'date_ranges': set()
+                   }
+               sports_summary[sport_display_name]['count'] += 1
+               sports_summary[sport_display_name]['sample_markets'].add(prop_data.market)
+               sports_summary[sport_display_name]['date_ranges'].add(date_range)
    
-   print(f"Total unique props scraped: {len(all_props_data)}")
-   return all_props_data
+   # Convert sets to lists for JSON serialization
+   for sport in sports_summary:
+       sports_summary[sport]['sample_markets'] = list(sports_summary[sport]['sample_markets'])[:10]  # Limit to 10 examples
+       sports_summary[sport]['date_ranges'] = list(sports_summary[sport]['date_ranges'])
+   
+   for config in SPORT_CONFIGS.values():
+       logger.info("Total props found for %s: %d", config['name'], len(props_by_sport.get(config['name'], [])))
+   
+   logger.info("Total unique props scraped: %d (%d duplicates skipped)", len(all_props_data), duplicates_skipped)
+   return all_props_data, props_by_sport, sports_summary
+
+def parse_props_page(html, sport_display_name, date_range, scrape_ts):
+   """Parse all prop rows out of a fetched sport/date page; None when the page has no props table"""
+   # fetch() hands over its bytearray buffer as-is; the copy to bytes selectolax needs happens here in the worker
+   tree = LexborHTMLParser(bytes(html))
+   
+   # Find the props table
+   props_table = tree.css_first('table.tb_pp_table')
+   
+   if not props_table:
+       logger.info("No props table found for %s on %s", sport_display_name, date_range)
+       return None
+   
+   # Find all table rows (excluding header)
+   rows = props_table.css_first('tbody')
+   if not rows:
+       logger.info("No tbody found for %s on %s", sport_display_name, date_range)
+       return []
+   
+   prop_rows = rows.css('tr')
+   logger.debug("Found %d prop rows for %s on %s", len(prop_rows), sport_display_name, date_range)
+   
+   page_props = [parse_prop_row(row, sport_display_name, date_range, scrape_ts) for row in prop_rows]
+   return [prop_data for prop_data in page_props if prop_data]
 
-def parse_prop_row(row, sport_name, date_range):
+def parse_prop_row(row, sport_name, date_range, scrape_ts):
    """Parse individual prop row from the table"""
    try:
-       cells = row.find_all('td')
+       # Walk the row's children directly; row.css() would compile a selector for every row
+       cells = [node for node in row.iter() if node.tag == 'td']
        
        if len(cells) < 5:
-           print(f"    Row has fewer than 5 cells: {len(cells)}")
+           logger.debug("Row has fewer than 5 cells: %d", len(cells))
            return None
        
        # Extract data from cells
-       event = cells[0].text.strip()
-       event_date = cells[1].text.strip()
-       market = cells[2].text.strip()
-       betslip_line = cells[3].text.strip()
+       event = cells[0].text().strip()
+       event_date = cells[1].text().strip()
+       market = cells[2].text().strip()
+       betslip_line = cells[3].text().strip()
        
        # Convert betslip line (1+ -> Over 0.5, 2+ -> Over 1.5, etc.)
        converted_betslip_line = convert_bet_line(betslip_line)
        
        # Extract odds and link
        odds_cell = cells[4]
-       odds_link = odds_cell.find('a')
+       odds_link = next((node for node in odds_cell.traverse() if node.tag == 'a'), None)
        
        if odds_link:
-           odds = odds_link.text.strip()
-           draftkings_url = odds_link.get('href', '')
+           odds = odds_link.text().strip()
+           draftkings_url = odds_link.attributes.get('href') or ''
        else:
-           odds = odds_cell.text.strip()
+           odds = odds_cell.text().strip()
            draftkings_url = ''
        
-       prop_data = {
-           'event': event,
-           'event_date': event_date,
-           'market': market,
-           'betslip_line': betslip_line,
-           'converted_betslip_line': converted_betslip_line,
-           'odds': odds,
-           'draftkings_url': draftkings_url,
-           'sport': sport_name,
-           'scraped_date_range': date_range,
-           'scraped_timestamp': datetime.now().isoformat()
-       }
-       
-       print(f"        Parsed prop: {market} - {betslip_line} ({odds})")
-       return prop_data
+       return Prop(
+           event=event,
+           event_date=event_date,
+           market=market,
+           betslip_line=betslip_line,
+           # Only carry the converted line when it differs from the original
+           converted_betslip_line=converted_betslip_line if converted_betslip_line != betslip_line else None,
+           odds=odds,
+           draftkings_url=draftkings_url,
+           sport=sport_name,
+           scraped_date_range=date_range,
+           scraped_timestamp=scrape_ts
+       )
        
    except Exception as e:
-       print(f"    Error parsing prop row: {e}")
+       logger.debug("Error parsing prop row: %s", e)
        return None
 
-def filter_by_sport(props, sport_name):
-   """Filter props by sport"""
-   return [prop for prop in props if prop['sport'].lower() == sport_name.lower()]
+def filter_by_sport(props_by_sport, sport_name):
+   """Get a sport's bucket of props by display name, ignoring case"""
+   sport_props = props_by_sport.get(sport_name)
+   if sport_props is not None:
+       return sport_props
+   
+   # Fall back to scanning the handful of sport names, not the props themselves
+   sport_name = sport_name.lower()
+   return next((sport_props for sport, sport_props in props_by_sport.items() if sport.lower() == sport_name), [])
 
-def get_top_props_by_sport(props, limit=10):
+def get_top_props_by_sport(props_by_sport, limit=10):
    """Get top props grouped by sport"""
-   sports_props = {}
+   # Limit each sport to top N props
+   return {sport: sport_props[:limit] for sport, sport_props in props_by_sport.items()}
+
+def precompute_payloads(props, props_by_sport, sports_summary, with_etags=True):
+   """Serialize the static part of every data endpoint once per cache refresh"""
+   cached = bool(props)
+   payloads = {
+       'all_props': {'props': props, 'count': len(props), 'cached': cached},
+       'test_props': {'first_5_props': props[:5], 'total_props': len(props), 'cached': cached},
+   }
    
-   for prop in props:
-       sport = prop['sport']
-       if sport not in sports_props:
-           sports_props[sport] = []
-       sports_props[sport].append(prop)
+   for sport in SPORT_ENDPOINTS:
+       sport_props = filter_by_sport(props_by_sport, sport)
+       payloads[sport.lower()] = {
+           'props': sport_props,
+           'count': len(sport_props),
+           'sport': sport,
+           'cached': cached
+       }
    
-   # Limit each sport to top N props
-   for sport in sports_props:
-       sports_props[sport] = sports_props[sport][:limit]
+   top_props = get_top_props_by_sport(props_by_sport, limit=10)
+   payloads['top_props_by_sport'] = {
+       'props_by_sport': top_props,
+       'total_props': len(props),
+       'sports_count': len(top_props),
+       'cached': cached
+   }
+   
+   payloads['props_summary'] = {
+       'summary': {
+           'total_props': len(props),
+           'sports_count': len(sports_summary),
+           'sports_breakdown': sports_summary,
+           'cached': cached
+       }
+   }
+   
+   # Filter props that had conversions
+   converted_props = [prop for prop in props if prop.converted_betslip_line is not None]
+   converted_count = len(converted_props)
+   payloads['converted_lines'] = {
+       'converted_props': converted_props,
+       'count': converted_count,
+       'total_props': len(props),
+       'conversion_rate': f"{converted_count * 100 / len(props):.1f}%" if props else "0%",
+       'cached': cached
+   }
+   
+   # Drop the closing brace so per-request fields can be appended without re-serializing
+   precomputed = {}
+   for name, payload in payloads.items():
+       prefix = orjson.dumps(payload, default=prop_as_dict)[:-1]
+       # ETags hash each payload's content, so endpoints whose data didn't change keep their tag
+       etag = hashlib.blake2b(prefix, digest_size=16).hexdigest() if with_etags else None
+       precomputed[name] = (prefix, *gzip_prefix(prefix), etag)
+   return precomputed
+
+def gzip_prefix(prefix):
+   """Gzip a payload prefix once, keeping the compressor open so a suffix can be appended later"""
+   compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+   compressed = compressor.compress(prefix) + compressor.flush(zlib.Z_SYNC_FLUSH)
+   return compressed, compressor
+
+def prop_as_dict(obj):
+   """orjson fallback that turns Prop records into JSON objects"""
+   if isinstance(obj, Prop):
+       prop = obj._asdict()
+       if prop['converted_betslip_line'] is None:
+           del prop['converted_betslip_line']
+       return prop
+   raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def ojsonify(obj):
+   """orjson-backed replacement for Flask's jsonify"""
+   return Response(orjson.dumps(obj), mimetype='application/json')
+
+def precomputed_response(name, include_cache_age=True):
+   """Serve a precomputed payload, appending the live cache age when requested"""
+   # Read the entry once so the 304 check, ETag and body all describe the same refresh
+   payload, gzipped_payload, compressor, etag = _precomputed[name]
+   
+   # Skip building the body entirely when the client already has this version
+   if etag is not None and request.if_none_match.contains_weak(etag):
+       response = Response(status=304)
+       response.set_etag(etag, weak=True)
+       return response
+   
+   response = build_payload_response(payload, gzipped_payload, compressor, include_cache_age)
+   if etag is not None:
+       response.set_etag(etag, weak=True)
+   return response
+
+def build_payload_response(payload, gzipped_payload, compressor, include_cache_age):
+   """Finish a precomputed payload, gzipping only the per-request suffix when the client accepts it"""
+   if include_cache_age:
+       cache_age_minutes = (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
+       suffix = b',"cache_age_minutes":' + orjson.dumps(cache_age_minutes) + b'}'
+   else:
+       suffix = b'}'
+   
+   if not request.accept_encodings['gzip']:
+       return Response(payload + suffix, mimetype='application/json')
+   
+   # Only the short suffix is compressed per request; a copy leaves the stored compressor reusable
+   compressor = compressor.copy()
+   response = Response(gzipped_payload + compressor.compress(suffix) + compressor.flush(), mimetype='application/json')
+   response.headers['Content-Encoding'] = 'gzip'
+   response.vary.add('Accept-Encoding')
+   return response
+
+def cacheable(view):
+   """Add Cache-Control to a data endpoint; the view itself sets the ETag and answers 304s"""
+   @functools.wraps(view)
+   def wrapper(*args, **kwargs):
+       get_cached_or_fresh_data()
+       response = view(*args, **kwargs)
+       
+       # No ETag means nothing has been scraped yet; don't let clients hold on to it
+       if response.get_etag()[0] is None:
+           response.cache_control.no_cache = True
+           return response
+       
+       # Let clients cache until the next page is due to be re-scraped
+       seconds_until_refresh = (next_refresh_at - datetime.now()).total_seconds() if next_refresh_at else 0
+       response.cache_control.public = True
+       response.cache_control.max_age = max(int(seconds_until_refresh), 0)
+       response.vary.add('Accept-Encoding')
+       return response
    
-   return sports_props
+   return wrapper
+
+# Empty payloads so endpoints can respond before the first scrape lands
+_precomputed = precompute_payloads([], {}, {}, with_etags=False)
 
 # Flask routes
 @app.route('/')
@@ -232,7 +663,7 @@ def home():
    return f"""
    <h1>DraftKings Player Props Scraper</h1>
    <p><strong>{cache_status}</strong></p>
-   <p>Cache Duration: {CACHE_DURATION_MINUTES} minutes</p>
+   <p>Cache Duration: {CACHE_DURATION_MINUTES} minutes (max age of a page's props)</p>
    <h2>Data Endpoints:</h2>
    <ul>
        <li><a href="/all-props">/all-props</a> - All player props</li>
@@ -257,239 +688,126 @@ def home():
    """
 
 @app.route('/all-props')
+@cacheable
 def get_all_props():
    """Get all player props"""
-   props = get_cached_or_fresh_data()
-   return jsonify({
-       'props': props,
-       'count': len(props),
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('all_props')
 
 @app.route('/mlb-props')
+@cacheable
 def get_mlb_props():
    """Get MLB player props only"""
-   all_props = get_cached_or_fresh_data()
-   mlb_props = filter_by_sport(all_props, 'MLB')
-   return jsonify({
-       'props': mlb_props,
-       'count': len(mlb_props),
-       'sport': 'MLB',
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('mlb')
 
 @app.route('/wnba-props')
+@cacheable
 def get_wnba_props():
    """Get WNBA player props only"""
-   all_props = get_cached_or_fresh_data()
-   wnba_props = filter_by_sport(all_props, 'WNBA')
-   return jsonify({
-       'props': wnba_props,
-       'count': len(wnba_props),
-       'sport': 'WNBA',
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('wnba')
 
 @app.route('/nba-props')
+@cacheable
 def get_nba_props():
    """Get NBA player props only"""
-   all_props = get_cached_or_fresh_data()
-   nba_props = filter_by_sport(all_props, 'NBA')
-   return jsonify({
-       'props': nba_props,
-       'count': len(nba_props),
-       'sport': 'NBA',
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('nba')
 
 @app.route('/nfl-props')
+@cacheable
 def get_nfl_props():
    """Get NFL player props only"""
-   all_props = get_cached_or_fresh_data()
-   nfl_props = filter_by_sport(all_props, 'NFL')
-   return jsonify({
-       'props': nfl_props,
-       'count': len(nfl_props),
-       'sport': 'NFL',
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('nfl')
 
 @app.route('/nhl-props')
+@cacheable
 def get_nhl_props():
    """Get NHL player props only"""
-   all_props = get_cached_or_fresh_data()
-   nhl_props = filter_by_sport(all_props, 'NHL')
-   return jsonify({
-       'props': nhl_props,
-       'count': len(nhl_props),
-       'sport': 'NHL',
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('nhl')
 
 @app.route('/ufc-props')
+@cacheable
 def get_ufc_props():
    """Get UFC player props only"""
-   all_props = get_cached_or_fresh_data()
-   ufc_props = filter_by_sport(all_props, 'UFC')
-   return jsonify({
-       'props': ufc_props,
-       'count': len(ufc_props),
-       'sport': 'UFC',
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('ufc')
 
 @app.route('/top-props-by-sport')
+@cacheable
 def get_top_props_by_sport_endpoint():
    """Get top 10 props per sport"""
-   all_props = get_cached_or_fresh_data()
-   top_props = get_top_props_by_sport(all_props, limit=10)
-   return jsonify({
-       'props_by_sport': top_props,
-       'total_props': len(all_props),
-       'sports_count': len(top_props),
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('top_props_by_sport')
 
 @app.route('/test-props')
+@cacheable
 def test_props():
    """Test endpoint - show first 5 props"""
-   props = get_cached_or_fresh_data()
-   return jsonify({
-       'first_5_props': props[:5],
-       'total_props': len(props),
-       'cached': bool(cached_props_data),
-       'cache_age_minutes': (datetime.now() - cache_timestamp).total_seconds() / 60 if cache_timestamp else 0
-   })
+   return precomputed_response('test_props')
 
 @app.route('/refresh-props-cache')
 def refresh_props_cache():
    """Force refresh the props cache"""
-   global cached_props_data, cache_timestamp
-   print("Forcing props cache refresh...")
-   cached_props_data = []
-   cache_timestamp = None
-   props = get_cached_or_fresh_data()
-   return jsonify({
+   logger.info("Forcing props cache refresh...")
+   props = refresh_cache(force=True)
+   return ojsonify({
        'message': 'Props cache refreshed successfully',
        'total_props': len(props),
-       'cache_timestamp': cache_timestamp.isoformat() if cache_timestamp else None
+       'cache_timestamp': cache_timestamp
    })
 
 @app.route('/props-summary')
+@cacheable
 def get_props_summary():
    """Get summary of all props by sport"""
-   all_props = get_cached_or_fresh_data()
-   
-   # Group by sport
-   sports_summary = {}
-   for prop in all_props:
-       sport = prop['sport']
-       if sport not in sports_summary:
-           sports_summary[sport] = {
-               'count': 0,
-               'sample_markets': set(),
-               'date_ranges': set()
-           }
-       sports_summary[sport]['count'] += 1
-       sports_summary[sport]['sample_markets'].add(prop['market'])
-       sports_summary[sport]['date_ranges'].add(prop['scraped_date_range'])
-   
-   # Convert sets to lists for JSON serialization
-   for sport in sports_summary:
-       sports_summary[sport]['sample_markets'] = list(sports_summary[sport]['sample_markets'])[:10]  # Limit to 10 examples
-       sports_summary[sport]['date_ranges'] = list(sports_summary[sport]['date_ranges'])
-   
-   return jsonify({
-       'summary': {
-           'total_props': len(all_props),
-           'sports_count': len(sports_summary),
-           'sports_breakdown': sports_summary,
-           'cached': bool(cached_props_data)
-       }
-   })
+   return precomputed_response('props_summary', include_cache_age=False)
 
 @app.route('/converted-lines')
+@cacheable
 def get_converted_lines():
    """Get props with converted bet lines (1+ -> Over 0.5, etc.)"""
-   all_props = get_cached_or_fresh_data()
-   
-   # Filter props that had conversions
-   converted_props = [
-       prop for prop in all_props 
-       if prop['betslip_line'] != prop['converted_betslip_line']
-   ]
-   
-   return jsonify({
-       'converted_props': converted_props,
-       'count': len(converted_props),
-       'total_props': len(all_props),
-       'conversion_rate': f"{len(converted_props)/len(all_props)*100:.1f}%" if all_props else "0%",
-       'cached': bool(cached_props_data)
-   })
+   return precomputed_response('converted_lines', include_cache_age=False)
 
 if __name__ == '__main__':
    # Test the scraper
    print("Testing props scraper...")
-   props = scrape_player_props()
-   
-   # Cache the data globally
-   cached_props_data = props
-   cache_timestamp = datetime.now()
+   props = refresh_cache()
    
    print(f"Found {len(props)} props")
    
    if props:
        print("\nFirst prop:")
-       print(f"Event: {props[0]['event']}")
-       print(f"Market: {props[0]['market']}")
-       print(f"Original Line: {props[0]['betslip_line']}")
-       print(f"Converted Line: {props[0]['converted_betslip_line']}")
-       print(f"Odds: {props[0]['odds']}")
-       print(f"Sport: {props[0]['sport']}")
-       print(f"Date Range: {props[0]['scraped_date_range']}")
+       print(f"Event: {props[0].event}")
+       print(f"Market: {props[0].market}")
+       print(f"Original Line: {props[0].betslip_line}")
+       print(f"Converted Line: {props[0].converted_betslip_line or props[0].betslip_line}")
+       print(f"Odds: {props[0].odds}")
+       print(f"Sport: {props[0].sport}")
+       print(f"Date Range: {props[0].scraped_date_range}")
    
    # Show summary by sport
    print("\n" + "="*50)
    print("PROPS SUMMARY BY SPORT")
    print("="*50)
    
-   sports_count = {}
-   for prop in props:
-       sport = prop['sport']
-       sports_count[sport] = sports_count.get(sport, 0) + 1
-   
-   for sport, count in sports_count.items():
-       print(f"{sport}: {count} props")
+   for sport, sport_props in cached_props_by_sport.items():
+       print(f"{sport}: {len(sport_props)} props")
    
    # Show converted lines examples
    print("\n" + "="*50)
    print("CONVERTED LINES EXAMPLES")
    print("="*50)
    
-   converted_examples = [
-       prop for prop in props 
-       if prop['betslip_line'] != prop['converted_betslip_line']
-   ][:10]
+   converted_examples = [prop for prop in props if prop.converted_betslip_line is not None]
    
-   for prop in converted_examples:
-       print(f"{prop['market']}: {prop['betslip_line']} -> {prop['converted_betslip_line']}")
+   for prop in converted_examples[:10]:
+       print(f"{prop.market}: {prop.betslip_line} -> {prop.converted_betslip_line}")
    
-   print(f"\nTotal conversions: {len([p for p in props if p['betslip_line'] != p['converted_betslip_line']])}")
+   print(f"\nTotal conversions: {len(converted_examples)}")
    
    print("\n" + "="*50)
    print("Starting Flask server...")
-   print(f"Data is cached for {CACHE_DURATION_MINUTES} minutes")
+   print(f"Each sport/date page's props are kept for at most {CACHE_DURATION_MINUTES} minutes without a successful scrape; each page is refreshed in the background every {REFRESH_INTERVAL_MINUTES - REFRESH_JITTER_MINUTES}-{REFRESH_INTERVAL_MINUTES} minutes")
    print("Visit /refresh-props-cache to force new scraping")
    print("="*50)
    
-   # Start Flask app
+   # Keep the cache warm, then start Flask app
+   start_background_refresh()
    port = int(os.environ.get('PORT', 5000))
    app.run(debug=False, host='0.0.0.0', port=port)